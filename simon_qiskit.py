@@ -1,12 +1,23 @@
 # simon_qiskit.py
-# Requires: qiskit, qiskit-aer, numpy
+# Requires: qiskit, qiskit-aer, numpy (numba optional)
 # pip install qiskit qiskit-aer numpy
 
-from qiskit import QuantumCircuit
+from qiskit import QuantumCircuit, transpile
 from qiskit_aer import AerSimulator # Changed import
 import numpy as np
-import random
 from collections import defaultdict
+from functools import lru_cache
+
+try:
+    from numba import njit
+    _HAVE_NUMBA = True
+except ImportError:
+    _HAVE_NUMBA = False
+    # numba is optional: without it the JIT kernels below run as plain Python.
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
 
 # -----------------------
 # Utilities: bit conversions
@@ -20,268 +31,433 @@ def bits_to_int(bits):
         x = (x << 1) | (int(b) & 1)
     return x
 
+# Lookup table of int_to_bits(x, n) for every n-bit x, built on first use for each n.
+# Only worth it on paths that convert all 2^n values; limited to n <= 16 (64K entries).
+_BITS_LUT_MAX_N = 16
+
+@lru_cache(maxsize=None)
+def _bits_table(n):
+    return [tuple((x >> i) & 1 for i in reversed(range(n))) for x in range(1 << n)]
+
 # -----------------------
 # Build a classical Simon function f: {0,1}^n -> {0,1}^n
-# Represented as a dict mapping int(x) -> int(f(x))
+# Represented as an array mapping[x] = f(x) for x in 0..2^n-1
 # Ensure f(x) = f(x ^ s) for all x.
-# We do this by partitioning the 2^n inputs into pairs (x, x^s) and assigning each pair a unique n-bit output.
-# For s = 0, f is one-to-one.
+# Each pair (x, x^s) is labelled by its smaller element, f(x) = min(x, x ^ s), which
+# is an n-bit value and needs no walk over the inputs.
+# For s = 0, f(x) = x is one-to-one.
+# The result is cached per (n, s_int) and returned read-only.
 # -----------------------
+@lru_cache(maxsize=None)
 def build_simon_function(n, s_int):
-    N = 1 << n
-    s_bits = int_to_bits(s_int, n)
-    seen = [False] * N
-    mapping = {}
-    next_output = 0
-    for x in range(N):
-        if seen[x]:
-            continue
-        y = x ^ s_int
-        # If s=0 then y == x; pair is a singleton
-        if y == x:
-            # unique mapping to next_output
-            mapping[x] = next_output
-            seen[x] = True
-            next_output += 1
-        else:
-            # pair (x, y)
-            mapping[x] = next_output
-            mapping[y] = next_output
-            seen[x] = seen[y] = True
-            next_output += 1
-    # map outputs to n-bit integers (we may reuse next_output as label; make sure it's n-bit)
-    # If next_output might be > 2^n - 1 (it won't), we would hash; but for this construction next_output <= 2^n
-    # For safety, convert label to an n-bit integer (fits).
-    # mapping values are already labels 0.. <=2^n-1
+    x = np.arange(1 << n, dtype=np.uint64)
+    mapping = np.minimum(x, x ^ np.uint64(s_int))
+    mapping.flags.writeable = False
     return mapping
 
+# -----------------------
+# Build the linear map M over GF(2) realising a Simon function f(x) = M x.
+# For s != 0 we pick p = the first (most significant) set bit of s and use
+# f(x) = x ^ (x_p * s), i.e. M = I + s e_p^T.  Its kernel is exactly {0, s}
+# (since s_p = 1), so f(x) = f(x ^ s) and f is two-to-one.  For s = 0, M = I
+# and f is one-to-one.
+# Bit order matches int_to_bits: row/column 0 is the most significant bit.
+# -----------------------
+def build_simon_linear_map(n, s_int):
+    M = np.eye(n, dtype=np.uint8)
+    if s_int == 0:
+        return M
+    s_bits = np.array(int_to_bits(s_int, n), dtype=np.uint8)
+    p = int(np.flatnonzero(s_bits)[0])
+    M[:, p] ^= s_bits
+    return M
+
+# -----------------------
+# Truth table of the same linear function, f(x) = M x = x ^ (x_p * s), for all inputs.
+# x_p is the integer bit of x at the position of the leading set bit of s.
+# This is the function the oracle circuit implements, for simulators that take f directly.
+# -----------------------
+def linear_simon_function(n, s_int):
+    x = np.arange(1 << n, dtype=np.uint64)
+    if s_int == 0:
+        return x
+    q = np.uint64(s_int.bit_length() - 1)
+    return x ^ (((x >> q) & np.uint64(1)) * np.uint64(s_int))
+
 # -----------------------
 # Build an oracle quantum circuit implementing U_f: |x>|0> -> |x>|f(x)>
-# We'll implement the oracle by, for each x in domain, flipping output qubits to match f(x) using multi-controlled X gates.
-# For small n this is fine. For larger n you'd build more optimized reversible circuits.
+# Since f(x) = M x is linear, the oracle is just one CNOT per non-zero entry of M:
+# output bit i accumulates input bit j whenever M[i, j] == 1.  M[p, p] is cleared, so
+# for s != 0 this is n + popcount(s) - 2 CNOTs (at most 2n-2), and n CNOTs for s = 0,
+# with no multi-controlled gates and no per-input enumeration.
 # -----------------------
-def build_oracle_circuit(n, mapping):
+def build_oracle_circuit(n, s_int):
     qc = QuantumCircuit(2*n, name='U_f')
     # input qubits: 0..n-1 ; output qubits: n..2n-1
-    for x, fx in mapping.items():
-        x_bits = int_to_bits(x, n)
-        fx_bits = int_to_bits(fx, n)
-        # For each output bit that should be 1, apply a multi-controlled X controlled by the input qubits
-        # Implement multi-control by using the `mcx` method (Qiskit supports ancilla-less for small numbers), but
-        # to avoid ancilla complexity, we use technique: apply X to control qubits where control should be 0, then mcx, then undo.
-        control_qubits = list(range(n))
+    M = build_simon_linear_map(n, s_int)
+    for i, j in zip(*np.nonzero(M)):
+        qc.cx(int(j), n + int(i))
+    return qc
+
+# -----------------------
+# Generic truth-table oracle for an arbitrary mapping, mapping[x] = f(x).
+# We'll implement the oracle by, for each x in domain, flipping output qubits to match f(x) using multi-controlled X gates.
+# This costs O(n * 2^n) multi-controlled gates, so it is only useful for small n or
+# for functions that are not linear; Simon's algorithm itself uses build_oracle_circuit.
+# -----------------------
+def build_mapping_oracle_circuit(n, mapping):
+    qc = QuantumCircuit(2*n + 1, name='U_f')
+    # input qubits: 0..n-1 ; output qubits: n..2n-1 ; ancilla: 2n
+    # For an x whose f(x) has two or more set bits, we compute the condition "input == x"
+    # into the ancilla once, fan it out to those output bits with CNOTs, then uncompute it:
+    # 2 multi-controlled gates instead of one per set bit. With a single set bit that would
+    # cost an extra MCX, so those x keep the direct multi-controlled X onto the target.
+    ancilla = 2*n
+    to_bits = _bits_table(n).__getitem__ if n <= _BITS_LUT_MAX_N else (lambda v: int_to_bits(v, n))
+    for x, fx in enumerate(mapping):
+        x_bits = to_bits(x)
+        fx_bits = to_bits(int(fx))
         target = [n + i for i, b in enumerate(fx_bits) if b == 1]
         if len(target) == 0:
             continue
-        # For each target bit, apply multi-controlled X with controls matching x_bits
-        for t in target:
-            # Prepare controls: flip those control qubits where x_bit==0
-            for idx, bit in enumerate(x_bits):
-                if bit == 0:
-                    qc.x(idx)
-            # apply multi-controlled X to target t controlled by all input qubits
-            if n == 0:
-                qc.x(t)
-            elif n == 1:
-                qc.cx(0, t)
+        # Prepare controls: flip those control qubits where x_bit==0
+        for idx, bit in enumerate(x_bits):
+            if bit == 0:
+                qc.x(idx)
+        if len(target) == 1:
+            # apply multi-controlled X to the target directly
+            if n == 1:
+                qc.cx(0, target[0])
             else:
-                # Use mcx (multi-controlled Toffoli), which replaced mct
-                qc.mcx(list(range(n)), t) # Changed from mct to mcx
-            # Undo the control flips
-            for idx, bit in enumerate(x_bits):
-                if bit == 0:
-                    qc.x(idx)
+                qc.mcx(list(range(n)), target[0])
+        else:
+            # ancilla <- [input == x]
+            if n == 1:
+                qc.cx(0, ancilla)
+            else:
+                qc.mcx(list(range(n)), ancilla)
+            for t in target:
+                qc.cx(ancilla, t)
+            # uncompute the ancilla
+            if n == 1:
+                qc.cx(0, ancilla)
+            else:
+                qc.mcx(list(range(n)), ancilla)
+        # Undo the control flips
+        for idx, bit in enumerate(x_bits):
+            if bit == 0:
+                qc.x(idx)
     return qc
 
 # -----------------------
 # Simon algorithm circuit builder
 # -----------------------
 def simon_circuit(n, oracle_qc):
-    qc = QuantumCircuit(2*n, n)  # measure only first n bits
+    # oracle_qc may carry ancillas after the 2n data qubits
+    qc = QuantumCircuit(oracle_qc.num_qubits, n)  # measure only first n bits
     # Apply H on input register
     qc.h(range(n))
     # Append oracle (careful with registers alignment)
     qc.compose(oracle_qc, inplace=True)
     # Apply H again on input
     qc.h(range(n))
-    # Measure input register to classical bits
+    # Measure input register to classical bits.
+    # This must stay the only measurement and the last operation in the circuit: the
+    # state before it is then shot-independent, so Aer evolves it once and samples
+    # all shots from it instead of re-simulating the circuit per shot.
     qc.measure(range(n), range(n))
     return qc
 
 # -----------------------
-# Run on Aer simulator and collect measurement results
+# Measurement results are carried as two parallel arrays rather than a counts dict:
+#   keys: uint64 outcomes y, packed with qubit 0 as the MSB (the int_to_bits order)
+#   vals: int64 number of shots for each key
+# Aer keys put qubit 0 last, so they are parsed as integers and bit-reversed with a
+# byte-wise lookup table instead of reversing every key string.
+# -----------------------
+_REV8 = np.array([int(f'{i:08b}'[::-1], 2) for i in range(256)], dtype=np.uint8)
+
+def reverse_bits_vec(keys, n):
+    """Reverse the low n bits of each uint64 in keys"""
+    keys = np.ascontiguousarray(keys, dtype=np.uint64)
+    # reversing all 64 bits = reverse the byte order and the bits inside each byte
+    b = keys.view(np.uint8).reshape(-1, 8)
+    rev = np.ascontiguousarray(_REV8[b[:, ::-1]]).view(np.uint64).ravel()
+    return rev >> np.uint64(64 - n)
+
+def counts_to_arrays(counts, n):
+    """Convert an Aer counts dict into (keys, vals) arrays"""
+    keys = np.fromiter((int(k, 2) for k in counts), dtype=np.uint64, count=len(counts))
+    vals = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+    return reverse_bits_vec(keys, n), vals
+
 # -----------------------
+# Direct NumPy simulation of H - U_f - H for small n.
+# After the oracle the state is (1/sqrt(N)) sum_x |x>|f(x)>; the second Hadamard layer gives
+#   psi[y, z] = (1/N) * sum_{x: f(x)=z} (-1)^(x.y)
+# and the measured input register has marginal p[y] = sum_z |psi[y, z]|^2.
+# For a 2n-qubit state this tiny, skipping Aer (transpile, dispatch, result
+# serialisation) is far cheaper than the arithmetic itself.
+# Returns the sampled outcomes as (keys, vals) arrays.
+# -----------------------
+NUMPY_KERNEL_MAX_N = 8
+
+def run_simon_numpy(n, mapping, shots=1024):
+    N = 1 << n
+    f = np.asarray(mapping, dtype=np.int64)
+    # Sylvester construction: H[y, x] = (-1)^popcount(x & y)
+    H = np.ones((1, 1))
+    for _ in range(n):
+        H = np.kron(H, [[1, 1], [1, -1]])
+    psi = np.zeros((N, int(f.max()) + 1))
+    # psi[:, f(x)] += H[:, x] for every input x
+    np.add.at(psi.T, f, H.T)
+    psi /= N
+    p = (psi ** 2).sum(axis=1)
+    samples = np.random.choice(N, size=shots, p=p / p.sum())
+    keys, vals = np.unique(samples, return_counts=True)
+    return keys.astype(np.uint64), vals.astype(np.int64)
+
+# -----------------------
+# Run on Aer simulator and collect measurement results as (keys, vals) arrays
+# For n <= NUMPY_KERNEL_MAX_N the NumPy kernel above is used instead of Aer.
+# The Simon circuit and its transpiled form only depend on (n, s_int), so both are
+# built once and reused across retries and across test cases with the same secret.
+# -----------------------
+SIMON_BASIS_GATES = ['h', 'cx', 'x']
+_CIRCUIT_CACHE = {}
+_TRANSPILED_CACHE = {}
+
+@lru_cache(maxsize=None)
+def _aer_backend():
+    # One simulator instance shared by all runs.  The method is left automatic: the CNOT
+    # oracle makes the Simon circuit Clifford, so Aer runs it with the stabilizer method,
+    # which is far faster than statevector (and statevector-only settings such as gate
+    # fusion never apply).
+    return AerSimulator()
+
 def run_simon(n, s_int, shots=1024):
-    mapping = build_simon_function(n, s_int)
-    oracle = build_oracle_circuit(n, mapping)
-    circ = simon_circuit(n, oracle)
+    key = (n, s_int)
+    circ = _CIRCUIT_CACHE.get(key)
+    if circ is None:
+        oracle = build_oracle_circuit(n, s_int)
+        circ = _CIRCUIT_CACHE[key] = simon_circuit(n, oracle)
     # draw circuit if you want: print(circ.draw())
-    backend = AerSimulator() # Changed simulator initialization
+    if n <= NUMPY_KERNEL_MAX_N:
+        # simulate the same U_f as the returned circuit
+        keys, vals = run_simon_numpy(n, linear_simon_function(n, s_int), shots=shots)
+        return keys, vals, circ
+    backend = _aer_backend()
     # transpile into a form where we'll run statevector or qasm
-    job = backend.run(circ, shots=shots) # Changed from execute() to backend.run()
+    tqc = _TRANSPILED_CACHE.get(key)
+    if tqc is None:
+        # The circuit is built from H and CX only, which Aer executes natively, so
+        # transpiling to that basis at optimization_level=0 leaves nothing to rewrite.
+        # (Passing the backend as well would only trigger a target/basis conflict warning;
+        # AerSimulator has no coupling map.)
+        tqc = _TRANSPILED_CACHE[key] = transpile(circ, basis_gates=SIMON_BASIS_GATES,
+                                                 optimization_level=0)
+    # all measurements are terminal, so Aer samples every shot from a single simulation
+    job = backend.run(tqc, shots=shots) # Changed from execute() to backend.run()
     result = job.result()
-    counts = result.get_counts()
-    return counts, circ
+    keys, vals = counts_to_arrays(result.get_counts(), n)
+    return keys, vals, circ
 
 # -----------------------
 # Classical postprocessing: solve for s (GF(2) linear algebra)
 # Given measured strings y satisfying y·s=0, collect n-1 independent rows to solve.
 # We'll use Gaussian elimination mod 2 to find s (up to 2 solutions when s=0 => trivial).
 # -----------------------
-def solve_for_s_from_measurements(n, measured_bitstrings):
-    # measured_bitstrings: list of strings like '010'
-    # Build matrix over GF(2). Each measured string is a row vector; we want the nullspace vector s != 0 (if exists)
-    # We'll collect rows and perform elimination to find a non-trivial s.
-    rows = []
-    # Convert bitstrings to integer rows
-    for b in measured_bitstrings:
-        rows.append([int(ch) for ch in b])
-    # Gaussian elimination to row echelon form
-    # We'll find the nullspace by finding vector s where rows * s = 0
-    # Convert to numpy for convenience
-    A = np.array(rows, dtype=int)
-    # If A has fewer than n-1 independent rows, algorithm may need more shots
-    # We'll compute nullspace over GF(2) using simple elimination
-    # Form augmented matrix? We solve A s = 0.
-    # Compute nullspace by performing row reduction and extracting free variables.
-    # Use basic GF(2) elimination
-    A = A.copy()
-    r, c = A.shape if A.size else (0, n)
-    # pad rows if needed
-    if r == 0:
-        return None
+def _pack_bitstrings(bitstrings, n):
+    # Pack each measured string into a single uint64 row; column 0 is the most significant bit.
+    if n > 64:
+        raise ValueError(f"packed GF(2) rows support n <= 64 (got n={n})")
+    r = len(bitstrings)
+    if any(len(b) != n for b in bitstrings):
+        raise ValueError(f"expected bitstrings of length {n}")
+    # Parse all strings at once: one byte per character, '0'/'1' -> 0/1
+    raw = np.frombuffer(''.join(bitstrings).encode('ascii'), dtype=np.uint8) - np.uint8(ord('0'))
+    if raw.size and raw.max() > 1:
+        raise ValueError("bitstrings may only contain '0' and '1'")
+    # Left-pad each row to 64 bits, pack 8 bits per byte (MSB first) and read as big-endian uint64
+    bits = np.zeros((r, 64), dtype=np.uint8)
+    bits[:, 64 - n:] = raw.reshape(r, n)
+    return np.packbits(bits, axis=1).view('>u8').ravel().astype(np.uint64)
+
+def _as_packed(measured, n):
+    # Accept either bitstrings or already-packed uint64 rows; always returns a fresh
+    # array since the elimination kernels work in place.
+    if isinstance(measured, np.ndarray):
+        return np.array(measured, dtype=np.uint64)
+    return _pack_bitstrings(measured, n)
+
+def _format_rows(rows, n):
+    # Set of bitstrings for diagnostics output
+    return {format(int(v), f'0{n}b') for v in rows}
+
+@njit(cache=True)
+def _reduce_and_solve(rows, n):
+    # JIT kernel: in-place GF(2) elimination of packed uint64 rows, then back-substitution.
+    # Returns (rank, s) from the single reduction: s is one non-zero vector with
+    # rows * s = 0, or 0 if the rows have full rank n.
+    r = rows.shape[0]
+    one = np.uint64(1)
+    pivot_cols = np.empty(n, dtype=np.int64)
     rank = 0
-    pivot_cols = []
     for col in range(n):
-        # find pivot row with A[row,col] == 1 for row >= rank
-        pivot = None
+        if rank == r:
+            break
+        bit = one << np.uint64(n - 1 - col)
+        pivot = -1
         for row in range(rank, r):
-            if A[row, col] == 1:
+            if rows[row] & bit:
                 pivot = row
                 break
-        if pivot is None:
+        if pivot < 0:
             continue
-        # swap
-        if pivot != rank:
-            A[[pivot, rank]] = A[[rank, pivot]]
-        pivot_cols.append(col)
-        # eliminate below
-        for row in range(rank+1, r):
-            if A[row, col] == 1:
-                A[row] ^= A[rank]  # xor row
+        tmp = rows[pivot]
+        rows[pivot] = rows[rank]
+        rows[rank] = tmp
+        for row in range(rank + 1, r):
+            if rows[row] & bit:
+                rows[row] ^= rows[rank]
+        pivot_cols[rank] = col
         rank += 1
+    if rank == n:
+        return rank, np.uint64(0)
+    # first free (non-pivot) column; pivot_cols[:rank] is increasing
+    free = 0
+    k = 0
+    for col in range(n):
+        if k < rank and pivot_cols[k] == col:
+            k += 1
+        else:
+            free = col
+            break
+    s = one << np.uint64(n - 1 - free)
+    # back-substitute pivot variables from bottom to top: s[pivot] = parity(row & s) over later columns
+    for i in range(rank - 1, -1, -1):
+        shift = np.uint64(n - 1 - pivot_cols[i])
+        v = rows[i] & s & ((one << shift) - one)
+        parity = np.uint64(0)
+        while v:
+            parity ^= one
+            v &= v - one
+        s |= parity << shift
+    return rank, s
+
+def _reduce_and_solve_numpy(rows, n):
+    # Same contract as _reduce_and_solve, vectorised with numpy for when numba is missing:
+    # the pivot search and the elimination below the pivot are single array ops per column.
+    r = len(rows)
+    one = np.uint64(1)
+    rank = 0
+    pivot_cols = []
+    for col in range(n):
         if rank == r:
             break
-    # If rank < n, nullspace dimension >= 1. Find one non-zero vector s in nullspace.
-    # We'll solve by setting free variables to produce a non-zero s.
+        shift = np.uint64(n - 1 - col)
+        nz = np.flatnonzero((rows[rank:] >> shift) & one)
+        if nz.size == 0:
+            continue
+        pivot = rank + int(nz[0])
+        if pivot != rank:
+            rows[[pivot, rank]] = rows[[rank, pivot]]
+        below = rows[rank+1:]
+        below[((below >> shift) & one).astype(bool)] ^= rows[rank]
+        pivot_cols.append(col)
+        rank += 1
     if rank == n:
-        # Only trivial solution
-        return 0  # s = 0
-    # find a vector in nullspace:
-    # We can brute-force all 2^n candidates small n; but for generality perform back-substitution:
-    # We'll select one free column, set it to 1, others free=0, then solve for pivot variables.
-    pivot_set = set(pivot_cols)
-    free_cols = [col for col in range(n) if col not in pivot_set]
-    if len(free_cols) == 0:
-        return 0
-    # Build reduced echelon form for back-substitution (we already have upper-triangular)
-    # We'll create an augmented matrix for solving A_reduced * s = 0. We will pick s[free_cols[0]] = 1
-    s = [0]*n
-    free_choice = free_cols[0]
-    s[free_choice] = 1
-    # Backsolve for pivot variables from bottom to top
-    # Work on the rows of A (which are r x n, in echelon form).
+        return rank, np.uint64(0)
+    free = next(col for col in range(n) if col not in pivot_cols)
+    s = 1 << (n - 1 - free)
     for i in reversed(range(rank)):
-        # find pivot col for this row
-        row = A[i]
-        pivot_col = None
-        for j in range(n):
-            if row[j] == 1:
-                pivot_col = j
-                break
-        if pivot_col is None:
-            continue
-        # compute rhs = sum(row[j]*s[j]) for j>pivot_col
-        rhs = 0
-        for j in range(pivot_col+1, n):
-            rhs ^= (row[j] & s[j])
-        s[pivot_col] = rhs  # because total must be 0 => pivot * s[pivot] ^ rhs = 0 => s[pivot] = rhs
-    return bits_to_int(s)
+        shift = n - 1 - pivot_cols[i]
+        rhs = bin(int(rows[i]) & s & ((1 << shift) - 1)).count('1') & 1
+        s |= rhs << shift
+    return rank, np.uint64(s)
+
+if not _HAVE_NUMBA:
+    # The loop kernel above would run opcode by opcode in the interpreter.
+    _reduce_and_solve = _reduce_and_solve_numpy
+
+def solve_for_s_from_measurements(n, measured_bitstrings):
+    # measured_bitstrings: list of strings like '010', or packed uint64 rows
+    # Build matrix over GF(2). Each measured string is a row vector; we want the nullspace vector s != 0 (if exists)
+    # Rows are bit-packed into uint64 and reduced by the JIT kernel _reduce_and_solve.
+    A = _as_packed(measured_bitstrings, n)
+    if len(A) == 0:
+        return None
+    _, s = _reduce_and_solve(A, n)
+    return int(s)
+
+# Compile (or load from cache) the JIT kernel once at import time.
+_reduce_and_solve(np.zeros(1, dtype=np.uint64), 1)
 
 # -----------------------
 # Enhanced solver with dependency checking and validation
 # -----------------------
 def check_linear_independence(vectors, n):
     """Check if vectors are linearly independent over GF(2)"""
-    if not vectors:
+    if len(vectors) == 0:
         return False, 0
-    A = np.array([[int(ch) for ch in v] for v in vectors], dtype=int)
-    # Row reduction to find rank
-    A = A.copy()
-    r, c = A.shape
-    rank = 0
-    for col in range(min(n, r)):
-        pivot = None
-        for row in range(rank, r):
-            if A[row, col] == 1:
-                pivot = row
-                break
-        if pivot is None:
-            continue
-        if pivot != rank:
-            A[[pivot, rank]] = A[[rank, pivot]]
-        for row in range(rank+1, r):
-            if A[row, col] == 1:
-                A[row] ^= A[rank]
-        rank += 1
-        if rank == r:
-            break
-    return rank >= n - 1, rank
+    A = _as_packed(vectors, n)
+    rank, _ = _reduce_and_solve(A, n)
+    return rank >= n - 1, int(rank)
 
 def solve_for_s_enhanced(n, measured_bitstrings, verbose=False):
     """Enhanced solver with detailed diagnostics"""
-    if not measured_bitstrings:
+    if len(measured_bitstrings) == 0:
         return None, "No measurements"
 
+    measured = _as_packed(measured_bitstrings, n)
     # Remove '0000...' uninformative measurements
-    useful_measurements = [m for m in measured_bitstrings if m != '0'*n]
+    useful_measurements = measured[measured != 0]
 
-    if not useful_measurements:
+    if len(useful_measurements) == 0:
         return None, "All measurements uninformative (y=0...0)"
 
-    # Check linear independence
-    is_independent, rank = check_linear_independence(useful_measurements, n)
+    if verbose:
+        print(f"  Measured vectors: {_format_rows(measured, n)}")
+        print(f"  Useful vectors: {_format_rows(useful_measurements, n)}")
+
+    # One elimination gives both the rank (linear independence check) and s.
+    # useful_measurements is already a fresh array, so it is reduced in place.
+    rank, s_int = _reduce_and_solve(useful_measurements, n)
+    is_independent = rank >= n - 1
 
     if verbose:
-        print(f"  Measured vectors: {set(measured_bitstrings)}")
-        print(f"  Useful vectors: {set(useful_measurements)}")
         print(f"  Rank: {rank}/{n-1} needed")
 
-    if not is_independent and rank < n - 1:
+    if not is_independent:
         return None, f"Insufficient independent vectors (rank={rank}, need {n-1})"
 
-    # Solve using the original solver
-    s_int = solve_for_s_from_measurements(n, useful_measurements)
-    return s_int, "Success"
+    return int(s_int), "Success"
 
 # -----------------------
 # Simulate noisy measurements (for hardware failure case)
 # -----------------------
-def add_measurement_noise(counts, noise_prob=0.3):
+# Merging into a dense 2^n histogram beats np.unique's sort only while the histogram is
+# small or the keys fill a good share of it (measured break-even: ~8 bins per key).
+_DENSE_HIST_MIN_BINS = 1 << 10
+_DENSE_HIST_BINS_PER_KEY = 8
+
+def add_measurement_noise(keys, vals, n, noise_prob=0.3):
     """Simulate hardware noise by flipping bits in measurement results"""
-    noisy_counts = {}
-    for bitstring, count in counts.items():
-        # Randomly corrupt some measurements
-        if random.random() < noise_prob:
-            # Flip a random bit
-            bits = list(bitstring)
-            flip_pos = random.randint(0, len(bits)-1)
-            bits[flip_pos] = '1' if bits[flip_pos] == '0' else '0'
-            noisy_bitstring = ''.join(bits)
-            noisy_counts[noisy_bitstring] = noisy_counts.get(noisy_bitstring, 0) + count
-        else:
-            noisy_counts[bitstring] = noisy_counts.get(bitstring, 0) + count
-    return noisy_counts
+    # Randomly corrupt some measurements: flip one random bit of each chosen outcome
+    do_flip = np.random.random(len(keys)) < noise_prob
+    positions = np.random.randint(0, n, len(keys)).astype(np.uint64)
+    flipped = keys ^ (np.uint64(1) << positions)
+    noisy = np.where(do_flip, flipped, keys)
+    # Outcomes that collide after flipping are merged, summing their counts
+    if (1 << n) <= max(_DENSE_HIST_MIN_BINS, _DENSE_HIST_BINS_PER_KEY * len(keys)):
+        # accumulate straight into a histogram over all 2^n outcomes
+        hist = np.zeros(1 << n, dtype=np.int64)
+        np.add.at(hist, noisy.astype(np.intp), vals)
+        noisy_keys = np.flatnonzero(hist)
+        return noisy_keys.astype(np.uint64), hist[noisy_keys]
+    noisy_keys, inverse = np.unique(noisy, return_inverse=True)
+    return noisy_keys, np.bincount(inverse.ravel(), weights=vals).astype(np.int64)
 
 # -----------------------
 # Test case executor
@@ -301,24 +477,21 @@ def run_test_case(case_num, description, n, s_int, shots=1024,
             print(f"\n--- Retry #{attempt} ---")
 
         # Run Simon's algorithm
-        counts, circ = run_simon(n, s_int, shots=shots)
+        keys, vals, circ = run_simon(n, s_int, shots=shots)
 
         # Add noise if simulating hardware failure
         if add_noise:
-            counts = add_measurement_noise(counts, noise_prob=0.4)
+            keys, vals = add_measurement_noise(keys, vals, n, noise_prob=0.4)
             print(f"Simulated hardware noise applied")
 
-        # Extract measurements
-        measured = []
-        for k, v in counts.items():
-            reversed_k = k[::-1]
-            measured.append(reversed_k)
+        # Measurements are the distinct outcomes
+        measured = keys
 
         # Limit measurements if needed (for dependency failure)
         if limit_measurements:
             measured = measured[:limit_measurements]
 
-        print(f"Measurements obtained: {set(measured)}")
+        print(f"Measurements obtained: {_format_rows(measured, n)}")
 
         # Solve for s
         s_found, status = solve_for_s_enhanced(n, measured, verbose=True)
@@ -350,33 +523,10 @@ def run_test_case(case_num, description, n, s_int, shots=1024,
     return False
 
 # -----------------------
-# Main test suite - All 6 cases from synopsis
+# Manually constructed cases (3 and 4) and the redundant-measurement run (5)
 # -----------------------
-if __name__ == "__main__":
-    print("="*80)
-    print("SIMON'S ALGORITHM - COMPREHENSIVE TEST SUITE")
-    print("Implementation of Simon's algorithm for different cases")
-    print("="*80)
-
-    # Case 1: Trivial Success (s=0000)
-    run_test_case(
-        case_num=1,
-        description="Trivial success",
-        n=4,
-        s_int=0b0000,
-        shots=1024
-    )
-
-    # Case 2: Ideal Success (s=1101)
-    run_test_case(
-        case_num=2,
-        description="Ideal success",
-        n=4,
-        s_int=0b1101,
-        shots=1024
-    )
-
-    # Case 3: Failure (dependency) - insufficient independent vectors
+def run_dependency_case():
+    """Case 3: Failure (dependency) - insufficient independent vectors"""
     # We simulate this by limiting the number of distinct measurements
     print(f"\n{'='*80}")
     print(f"Case 3: Failure (dependency)")
@@ -386,7 +536,6 @@ if __name__ == "__main__":
 
     # Manually create dependent measurements to demonstrate the failure
     n = 4
-    s_int = 0b1101
     # Create only 2 dependent measurements (need 3 independent for n=4)
     dependent_measurements = ['0110', '0110']  # Same vector repeated
     s_found, status = solve_for_s_enhanced(n, dependent_measurements, verbose=True)
@@ -395,7 +544,8 @@ if __name__ == "__main__":
         print(f"Reason: {status}")
         print(f"Status: RETRY needed")
 
-    # Case 4: Failure (uninformative y) - measures only y=0000
+def run_uninformative_case():
+    """Case 4: Failure (uninformative y) - measures only y=0000"""
     print(f"\n{'='*80}")
     print(f"Case 4: Failure (uninformative y)")
     print(f"{'='*80}")
@@ -403,6 +553,7 @@ if __name__ == "__main__":
     print(f"Expected: Measures uninformative y=0000 - Retry")
 
     # Manually create uninformative measurements
+    n = 4
     uninformative_measurements = ['0000', '0000', '0000']
     s_found, status = solve_for_s_enhanced(n, uninformative_measurements, verbose=True)
     if s_found is None:
@@ -410,7 +561,8 @@ if __name__ == "__main__":
         print(f"Reason: {status}")
         print(f"Status: RETRY needed")
 
-    # Case 5: Realistic Success - redundant y vectors but still recovers
+def run_realistic_case():
+    """Case 5: Realistic Success - redundant y vectors but still recovers"""
     print(f"\n{'='*80}")
     print(f"Case 5: Realistic success")
     print(f"{'='*80}")
@@ -418,9 +570,8 @@ if __name__ == "__main__":
     print(f"Expected: Redundant y vectors measured but recovers s")
 
     # Run with more shots to get redundant measurements
-    counts, circ = run_simon(4, 0b1101, shots=2048)
-    measured = [k[::-1] for k in counts.keys()]
-    print(f"Measurements obtained: {set(measured)}")
+    measured, _, circ = run_simon(4, 0b1101, shots=2048)
+    print(f"Measurements obtained: {_format_rows(measured, 4)}")
     s_found, status = solve_for_s_enhanced(4, measured, verbose=True)
     if s_found is not None:
         s_found_str = format(s_found, '04b')
@@ -428,16 +579,37 @@ if __name__ == "__main__":
         print(f"Recovered s = {s_found_str}")
         print(f"Verification: {'CORRECT' if s_found == 0b1101 else 'INCORRECT'}")
 
-    # Case 6: Hardware Failure - noisy measurements
-    run_test_case(
-        case_num=6,
-        description="Hardware failure (noisy run)",
-        n=4,
-        s_int=0b1101,
-        shots=1024,
-        add_noise=True,
-        max_retries=3
-    )
+# -----------------------
+# Main test suite - All 6 cases from synopsis
+# -----------------------
+if __name__ == "__main__":
+    print("="*80)
+    print("SIMON'S ALGORITHM - COMPREHENSIVE TEST SUITE")
+    print("Implementation of Simon's algorithm for different cases")
+    print("="*80)
+
+    cases = [
+        # Case 1: Trivial Success (s=0000)
+        (run_test_case, dict(case_num=1, description="Trivial success",
+                             n=4, s_int=0b0000, shots=1024)),
+        # Case 2: Ideal Success (s=1101)
+        (run_test_case, dict(case_num=2, description="Ideal success",
+                             n=4, s_int=0b1101, shots=1024)),
+        # Case 3: Failure (dependency) - insufficient independent vectors
+        (run_dependency_case, {}),
+        # Case 4: Failure (uninformative y) - measures only y=0000
+        (run_uninformative_case, {}),
+        # Case 5: Realistic Success - redundant y vectors but still recovers
+        (run_realistic_case, {}),
+        # Case 6: Hardware Failure - noisy measurements
+        (run_test_case, dict(case_num=6, description="Hardware failure (noisy run)",
+                             n=4, s_int=0b1101, shots=1024, add_noise=True, max_retries=3)),
+    ]
+
+    # The cases run in order in this process: together they take a few milliseconds,
+    # far less than starting worker processes (which re-import qiskit and numba) costs.
+    for func, kwargs in cases:
+        func(**kwargs)
 
     # Summary table
     print(f"\n{'='*80}")